@@ -1,47 +1,34 @@
 import bpy
 import bmesh
+import itertools
 import math
+import numpy as np
+import os
+import sys
 from mathutils import Vector
 
-def relax_vertices(bm, iterations=1, factor=1.0):
-    for _ in range(iterations):
-        new_positions = {}
-        
-        for vert in bm.verts:
-            if vert.is_boundary:
-                continue
-            
-            if len(vert.link_edges) > 0:
-                neighbor_avg = Vector((0, 0, 0))
-                neighbor_count = 0
-                
-                for edge in vert.link_edges:
-                    other_vert = edge.other_vert(vert)
-                    neighbor_avg += other_vert.co
-                    neighbor_count += 1
-                
-                neighbor_avg /= neighbor_count
-                new_positions[vert.index] = vert.co.lerp(neighbor_avg, factor)
-
-        for vert in bm.verts:
-            if vert.index in new_positions:
-                vert.co = new_positions[vert.index]
+# Blender runs these as text blocks rather than as a package, make the shared module importable
+for path in (os.path.dirname(os.path.abspath(__file__)), bpy.path.abspath("//")):
+    if os.path.isdir(path) and path not in sys.path:
+        sys.path.append(path)
+
+from remesh_core import (
+    edge_boundary_mask,
+    edge_lengths,
+    edge_vertex_indices,
+    face_vertex_indices,
+    relax_vertices,
+    triangle_areas,
+    vertex_boundary_mask,
+    vertex_coords,
+)
 
 def connect_edges(bm, verts):
-    for vert0 in verts:
-        for vert1 in verts[1:]:
+    for vert0, vert1 in itertools.combinations(verts, 2):
+        if bm.edges.get((vert0, vert1)) is None:
             bm.edges.new([vert0, vert1])
 
-def create_triangle(max_cuts, cuts_a, cuts_b, cuts_c):
-    bm = bmesh.new()
-    bm_v0 = bm.verts.new(Vector((-1, -1, 0)))
-    bm_v1 = bm.verts.new(Vector((1, -1, 0)))
-    bm_v2 = bm.verts.new(Vector((0, 1, 0)))
-    bm.faces.new([bm_v0, bm_v1, bm_v2])
-    
-    bm.verts.ensure_lookup_table()
-    bm.edges.ensure_lookup_table()
- 
+def create_triangle(bm, max_cuts, cuts_a, cuts_b, cuts_c):
     # Fit edges to cuts
     longest_edge = max([cuts_a+1, cuts_b+1, cuts_c+1]) / (max_cuts+1)
     
@@ -49,18 +36,31 @@ def create_triangle(max_cuts, cuts_a, cuts_b, cuts_c):
     target_edge_1 = (cuts_b+1)/(max_cuts+1)
     target_edge_2 = (cuts_c+1)/(max_cuts+1)
     
-    max_iterations = 100
-    iteration = 0
-    while iteration < max_iterations:
-        iteration=iteration+1
-        
-        scale_edge_0 = target_edge_0/bm.edges[0].calc_length()
-        scale_edge_1 = target_edge_1/bm.edges[1].calc_length()
-        scale_edge_2 = target_edge_2/bm.edges[2].calc_length()
-        
-        bmesh.ops.scale(bm, verts=bm.edges[0].verts, vec=(scale_edge_0, scale_edge_0, scale_edge_0))
-        bmesh.ops.scale(bm, verts=bm.edges[1].verts, vec=(scale_edge_1, scale_edge_1, scale_edge_1))
-        bmesh.ops.scale(bm, verts=bm.edges[2].verts, vec=(scale_edge_2, scale_edge_2, scale_edge_2))
+    # Edges are created as v0-v1, v1-v2, v2-v0, so solve for the angle at v1 with the law of cosines
+    cos_angle = (target_edge_0**2 + target_edge_1**2 - target_edge_2**2) / (2*target_edge_0*target_edge_1)
+    
+    # Lengths that violate the triangle inequality form a flat or no triangle. The old iterative fit
+    # collapsed v1 onto the origin in that case, which leaves 135 degrees at v1 with the first two
+    # edges keeping their ratio, so reproduce that limit shape.
+    if abs(cos_angle) >= 1.0:
+        cos_angle = -math.sqrt(0.5)
+    
+    sin_angle = math.sqrt(1.0 - cos_angle**2)
+    
+    co_0 = Vector((0, 0, 0))
+    co_1 = Vector((target_edge_0, 0, 0))
+    co_2 = co_1 + Vector((-cos_angle, sin_angle, 0))*target_edge_1
+    centroid = (co_0 + co_1 + co_2) / 3
+    
+    bm.clear()
+    assert len(bm.verts) == 0
+    
+    bm_v0 = bm.verts.new(co_0 - centroid)
+    bm_v1 = bm.verts.new(co_1 - centroid)
+    bm_v2 = bm.verts.new(co_2 - centroid)
+    bm.faces.new([bm_v0, bm_v1, bm_v2])
+    
+    bm.edges.ensure_lookup_table()
  
     # Subdivide initial edges
     temp_edges = [bm.edges[0], bm.edges[1], bm.edges[2]]
@@ -69,33 +69,34 @@ def create_triangle(max_cuts, cuts_a, cuts_b, cuts_c):
     bmesh.ops.subdivide_edges(bm, edges=[temp_edges[1]], cuts=int(cuts_b))
     bmesh.ops.subdivide_edges(bm, edges=[temp_edges[2]], cuts=int(cuts_c))
     
-    bm.verts.ensure_lookup_table()
-    bm.edges.ensure_lookup_table()
-    
     # Triangulate initial state    
-    target_edge_length = min([edge.calc_length() for edge in bm.edges])
+    target_edge_length = edge_lengths(bm).min()
     
     bmesh.ops.triangulate(bm, faces=bm.faces[:])
-    bm.edges.ensure_lookup_table()
-    bm.verts.ensure_lookup_table()
     
     # Generate tessellation pattern for this triangle.
     # Bail out for weird configurations that fail    
     failed = False
-    num_boundary_edges = len([e for e in bm.edges if e.is_boundary])
+    num_boundary_edges = np.count_nonzero(edge_boundary_mask(bm))
+    
+    # Only interior vertices are created or merged from here on, so the boundary set never changes
+    boundary_verts = {vert for vert in bm.verts if vert.is_boundary}
 
     for _ in range(100):
         modified = False
 
-        edges_to_subdivide = [e for e in bm.edges if not e.is_boundary and e.calc_length() > target_edge_length*1.2]
+        lengths = edge_lengths(bm)
+        long_edges = ~edge_boundary_mask(bm) & (lengths > target_edge_length*1.2)
+        
+        # Lookup tables are only refreshed here, relax_vertices maintains its own
+        bm.edges.ensure_lookup_table()
+        edges_to_subdivide = [bm.edges[i] for i in np.flatnonzero(long_edges)]
         
         if edges_to_subdivide:
             bmesh.ops.subdivide_edges(bm, edges=edges_to_subdivide, cuts=1)
             bmesh.ops.triangulate(bm, faces=bm.faces[:])
-            bm.verts.ensure_lookup_table()
-            bm.edges.ensure_lookup_table()
             
-            if num_boundary_edges != len([e for e in bm.edges if e.is_boundary]):
+            if num_boundary_edges != np.count_nonzero(edge_boundary_mask(bm)):
                 failed=True
                 break
             
@@ -104,18 +105,20 @@ def create_triangle(max_cuts, cuts_a, cuts_b, cuts_c):
         for _ in range(100):
             num_verts = len(bm.verts)
    
-            bmesh.ops.remove_doubles(bm, verts=[vert for vert in bm.verts if not vert.is_boundary], dist=target_edge_length*0.6)
-            bmesh.ops.triangulate(bm, faces=bm.faces[:])
-            bm.verts.ensure_lookup_table()
-            bm.edges.ensure_lookup_table()
+            bmesh.ops.remove_doubles(bm, verts=[vert for vert in bm.verts if vert not in boundary_verts], dist=target_edge_length*0.6)
+            merged = num_verts != len(bm.verts)
+            
+            # Nothing merged means faces are still triangles and the boundary is untouched
+            if merged:
+                bmesh.ops.triangulate(bm, faces=bm.faces[:])
 
-            if num_boundary_edges != len([e for e in bm.edges if e.is_boundary]):
-                failed=True
-                break            
+                if num_boundary_edges != np.count_nonzero(edge_boundary_mask(bm)):
+                    failed=True
+                    break            
             
             relax_vertices(bm)
             
-            if (num_verts != len(bm.verts)):
+            if merged:
                 modified = True
             else:
                 break
@@ -124,17 +127,22 @@ def create_triangle(max_cuts, cuts_a, cuts_b, cuts_c):
             break
     
     if not failed:
+        displacement = math.inf
         for _ in range(100):
             num_verts = len(bm.verts)
        
-            bmesh.ops.remove_doubles(bm, verts=[vert for vert in bm.verts if not vert.is_boundary], dist=target_edge_length*0.6)
-            bmesh.ops.triangulate(bm, faces=bm.faces[:])
-            bm.verts.ensure_lookup_table()
-            bm.edges.ensure_lookup_table()
+            bmesh.ops.remove_doubles(bm, verts=[vert for vert in bm.verts if vert not in boundary_verts], dist=target_edge_length*0.6)
+            merged = num_verts != len(bm.verts)
             
-            relax_vertices(bm)
+            if merged:
+                bmesh.ops.triangulate(bm, faces=bm.faces[:])
+            elif displacement < target_edge_length*1e-6:
+                # Same topology and the last relax barely moved anything, another one won't either
+                break
+            
+            displacement = relax_vertices(bm)
             
-            if (num_verts == len(bm.verts)):
+            if not merged:
                 break
         
     if failed:
@@ -143,13 +151,18 @@ def create_triangle(max_cuts, cuts_a, cuts_b, cuts_c):
     
     # Additional failing criteria, but don't delete anything for manual inspection
     if not failed:
-        too_short_edges = [edge for edge in bm.edges if edge.verts[0].is_boundary != edge.verts[1].is_boundary and edge.calc_length() < target_edge_length*0.3]
-        if (len(too_short_edges) > 0):
+        lengths = edge_lengths(bm)
+        edge_verts = edge_vertex_indices(bm)
+        is_boundary_vert = vertex_boundary_mask(bm)
+        is_boundary_edge = edge_boundary_mask(bm)
+        
+        too_short_edges = (is_boundary_vert[edge_verts[:, 0]] != is_boundary_vert[edge_verts[:, 1]]) & (lengths < target_edge_length*0.3)
+        if too_short_edges.any():
             print(f"Failed short edge length constraint: {cuts_a}x{cuts_b}x{cuts_c}, review manually")    
             failed = True
         
-        too_long_edges = [edge for edge in bm.edges if not edge.is_boundary and edge.calc_length() > target_edge_length*1.3]
-        if (len(too_long_edges) > 0):
+        too_long_edges = ~is_boundary_edge & (lengths > target_edge_length*1.3)
+        if too_long_edges.any():
             print(f"Failed long edge length constraint: {cuts_a}x{cuts_b}x{cuts_c}, review manually")    
             failed = True
         
@@ -158,55 +171,107 @@ def create_triangle(max_cuts, cuts_a, cuts_b, cuts_c):
             print(f"Failed 3-pole constraint: {cuts_a}x{cuts_b}x{cuts_c}, review manually")    
             failed = True
         
-        min_triangle_area = min([f.calc_area() for f in bm.faces])
-        max_triangle_area = max([f.calc_area() for f in bm.faces])
-        if (min_triangle_area/max_triangle_area) < 0.1:
+        areas = triangle_areas(bm)
+        if (areas.min()/areas.max()) < 0.1:
             print(f"Failed triangle area constraint: {cuts_a}x{cuts_b}x{cuts_c}, review manually")
             failed = True
     
-    # Create mesh and object
-    mesh = bpy.data.meshes.new(name=f"Mesh_Triangle_{cuts_a}_{cuts_b}_{cuts_c}")
-    obj = bpy.data.objects.new(f"Triangle_{cuts_a}_{cuts_b}_{cuts_c}", mesh)
-    bpy.context.collection.objects.link(obj)
+    # Export plain arrays so the result can be sent back from a worker process
+    bm.verts.index_update()
+    verts = vertex_coords(bm)
+    faces = face_vertex_indices(bm)
     
-    # Update mesh
-    bm.to_mesh(mesh)
-    bm.free()
-    
-    # Update the scene
-    bpy.context.view_layer.objects.active = obj
-    obj.select_set(True)
-    
-    return obj, failed
+    return {"verts": verts, "faces": faces, "failed": failed}
 
+# BMesh reused by every triangle built in this process, keeps the allocator pools warm
+task_bmesh = None
 
-def create_all_triangle_combinations(min_length=1, max_length=16, step=1, spacing=20):
-    import itertools
+def create_triangle_task(task):
+    global task_bmesh
+    if task_bmesh is None:
+        task_bmesh = bmesh.new()
     
-    lengths = list(range(min_length, max_length + 1, step))
-    combinations = list(itertools.combinations_with_replacement(lengths, 3))
-    grid_size = math.ceil(math.sqrt(len(combinations)))
+    idx, max_cuts, a, b, c = task
+    return idx, (a, b, c), create_triangle(task_bmesh, max_cuts, a, b, c)
+
+def create_triangle_object(name, tri):
+    mesh = bpy.data.meshes.new(name=f"Mesh_{name}")
+    obj = bpy.data.objects.new(name, mesh)
+    
+    # Update mesh, bulk copy the arrays straight into Blender's storage.
+    # Every face is a triangle and loop_total is derived from loop_start.
+    verts = tri["verts"]
+    faces = tri["faces"]
+    
+    mesh.vertices.add(len(verts))
+    mesh.vertices.foreach_set("co", verts.astype(np.float32).ravel())
+    mesh.loops.add(faces.size)
+    mesh.loops.foreach_set("vertex_index", faces.astype(np.int32).ravel())
+    mesh.polygons.add(len(faces))
+    mesh.polygons.foreach_set("loop_start", np.arange(0, faces.size, 3, dtype=np.int32))
+    mesh.update(calc_edges=True)
     
-    for idx, (a, b, c) in enumerate(combinations):
+    return obj
+
+
+def place_triangle_objects(results, num_triangles, grid_size, spacing):
+    objects = []
+    for count, (idx, (a, b, c), tri) in enumerate(results, 1):
         row = idx // grid_size
         col = idx % grid_size
         
-        tri, failed = create_triangle(max_length, a, b, c)
+        obj = create_triangle_object(f"Triangle_{a}_{b}_{c}", tri)
         
         x = col * spacing
         y = row * spacing
-        tri.location = (x, y, 0)
+        obj.location = (x, y, 0)
         
         # Put failed configurations separately
-        if failed:
-            tri.name += ".failed"
-            tri.location[1] -= 100
+        if tri["failed"]:
+            obj.name += ".failed"
+            obj.location[1] -= 100
+        
+        objects.append(obj)
         
         # Print progress
-        if (idx + 1) % 100 == 0:
-            print(f"Created {idx + 1}/{len(combinations)} triangles...")
+        if count % 100 == 0:
+            print(f"Created {count}/{num_triangles} triangles...")
+    
+    return objects
+
+
+def create_all_triangle_combinations(min_length=1, max_length=16, step=1, spacing=20, processes=1):
+    global task_bmesh
+    import multiprocessing
+    
+    lengths = list(range(min_length, max_length + 1, step))
+    num_triangles = math.comb(len(lengths) + 2, 3)
+    grid_size = math.ceil(math.sqrt(num_triangles))
+    
+    combinations = itertools.combinations_with_replacement(lengths, 3)
+    tasks = ((idx, max_length, a, b, c) for idx, (a, b, c) in enumerate(combinations))
+    
+    # Triangles are independent, so they can optionally be tessellated in parallel while only this process touches bpy.
+    # Workers have to be forked from Blender since a spawned interpreter has no bmesh module, and forking a
+    # multithreaded Blender is only reasonably safe on Linux, so this is opt-in and serial everywhere else.
+    if processes > 1 and sys.platform.startswith("linux"):
+        with multiprocessing.get_context("fork").Pool(processes) as pool:
+            results = pool.imap_unordered(create_triangle_task, tasks, chunksize=8)
+            objects = place_triangle_objects(results, num_triangles, grid_size, spacing)
+    else:
+        objects = place_triangle_objects(map(create_triangle_task, tasks), num_triangles, grid_size, spacing)
+    
+    if task_bmesh is not None:
+        task_bmesh.free()
+        task_bmesh = None
+    
+    # Link everything at once so the scene is updated a single time
+    collection = bpy.context.collection
+    for obj in objects:
+        collection.objects.link(obj)
+    bpy.context.view_layer.update()
     
-    print(f"Created {len(combinations)} triangles!")
+    print(f"Created {num_triangles} triangles!")
 
 if __name__ == "__main__":
     bpy.ops.object.select_all(action='SELECT')
@@ -221,7 +286,7 @@ if __name__ == "__main__":
         min_length=0, 
         max_length=15,
         step=1,
-        spacing=4
+        spacing=1.25
     )
     
     bpy.ops.object.select_all(action='DESELECT')
@@ -0,0 +1,174 @@
+import numpy as np
+
+# Numba isn't bundled with Blender, fall back to plain NumPy when it's missing
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+def vertex_coords(bm):
+    return np.fromiter((c for vert in bm.verts for c in vert.co), dtype=np.float64, count=len(bm.verts)*3).reshape(-1, 3)
+
+def edge_vertex_indices(bm):
+    return np.fromiter((vert.index for edge in bm.edges for vert in edge.verts), dtype=np.int64, count=len(bm.edges)*2).reshape(-1, 2)
+
+def vertex_boundary_mask(bm):
+    return np.fromiter((vert.is_boundary for vert in bm.verts), dtype=bool, count=len(bm.verts))
+
+def edge_boundary_mask(bm):
+    return np.fromiter((edge.is_boundary for edge in bm.edges), dtype=bool, count=len(bm.edges))
+
+def edge_lengths(bm):
+    bm.verts.index_update()
+    coords = vertex_coords(bm)
+    edge_verts = edge_vertex_indices(bm)
+    return np.linalg.norm(coords[edge_verts[:, 1]] - coords[edge_verts[:, 0]], axis=1)
+
+def face_vertex_indices(bm):
+    return np.array([[vert.index for vert in face.verts] for face in bm.faces], dtype=np.int64)
+
+def triangle_areas(bm):
+    bm.verts.index_update()
+    coords = vertex_coords(bm)
+    faces = face_vertex_indices(bm)
+    
+    e1 = coords[faces[:, 1]] - coords[faces[:, 0]]
+    e2 = coords[faces[:, 2]] - coords[faces[:, 0]]
+    return 0.5 * np.linalg.norm(np.cross(e1, e2), axis=1)
+
+def csr_neighbors(bm):
+    num_verts = len(bm.verts)
+    edge_verts = edge_vertex_indices(bm)
+    
+    src = np.concatenate((edge_verts[:, 0], edge_verts[:, 1]))
+    dst = np.concatenate((edge_verts[:, 1], edge_verts[:, 0]))
+    
+    neighbors = dst[np.argsort(src, kind='stable')]
+    indptr = np.zeros(num_verts + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=num_verts), out=indptr[1:])
+    
+    return indptr, neighbors
+
+def csr_row_sums(values, indptr):
+    counts = np.diff(indptr)
+    sums = np.zeros((len(counts),) + values.shape[1:], dtype=np.float64)
+    
+    # reduceat misbehaves on empty rows, only reduce the non-empty ones so every segment ends where the next begins
+    nonempty = counts > 0
+    if nonempty.any():
+        sums[nonempty] = np.add.reduceat(values, indptr[:-1][nonempty], axis=0)
+    
+    return sums
+
+def uniform_weights(indptr):
+    counts = np.diff(indptr)
+    return 1.0 / np.repeat(counts, counts).astype(np.float64)
+
+def cotangent_weights(bm, coords, indptr, neighbors):
+    num_verts = len(coords)
+    counts = np.diff(indptr)
+    
+    tris = np.array([[loop.vert.index for loop in tri] for tri in bm.calc_loop_triangles()], dtype=np.int64).reshape(-1, 3)
+    if len(tris) == 0:
+        return uniform_weights(indptr)
+    
+    # Every corner contributes the cotangent of its angle to the opposite edge
+    edge_keys = []
+    edge_cots = []
+    for corner in range(3):
+        c = tris[:, corner]
+        a = tris[:, (corner + 1) % 3]
+        b = tris[:, (corner + 2) % 3]
+        
+        u = coords[a] - coords[c]
+        v = coords[b] - coords[c]
+        cross_length = np.maximum(np.linalg.norm(np.cross(u, v), axis=1), 1e-12)
+        
+        edge_keys.append(np.minimum(a, b)*num_verts + np.maximum(a, b))
+        edge_cots.append(np.einsum('ij,ij->i', u, v) / cross_length)
+    
+    unique_keys, inverse = np.unique(np.concatenate(edge_keys), return_inverse=True)
+    edge_weights = 0.5 * np.bincount(inverse, weights=np.concatenate(edge_cots))
+    
+    src = np.repeat(np.arange(num_verts), counts)
+    slot_keys = np.minimum(src, neighbors)*num_verts + np.maximum(src, neighbors)
+    slots = np.minimum(np.searchsorted(unique_keys, slot_keys), len(unique_keys) - 1)
+    weights = np.where(unique_keys[slots] == slot_keys, edge_weights[slots], 0.0)
+    
+    # Obtuse angles produce negative weights that make smoothing unstable
+    weights = np.maximum(weights, 0.0)
+    
+    # Normalize per vertex, vertices without usable weights fall back to the plain average
+    weight_sums = np.repeat(csr_row_sums(weights, indptr), counts)
+    return np.where(weight_sums > 1e-12, weights / np.maximum(weight_sums, 1e-12), uniform_weights(indptr))
+
+def relax_iterations_numpy(coords, indptr, neighbors, weights, movable, iterations, factor):
+    for _ in range(iterations):
+        neighbor_avg = csr_row_sums(weights[:, None] * coords[neighbors], indptr)
+        coords[movable] += factor * (neighbor_avg[movable] - coords[movable])
+    
+    return coords
+
+if njit is not None:
+    # Meshes here only have a few hundred vertices and may already run in pool workers, so stay single threaded
+    @njit(cache=True)
+    def relax_iterations(coords, indptr, neighbors, weights, movable, iterations, factor):
+        for _ in range(iterations):
+            new_coords = coords.copy()
+            
+            for i in range(coords.shape[0]):
+                if not movable[i]:
+                    continue
+                
+                s0 = 0.0
+                s1 = 0.0
+                s2 = 0.0
+                for k in range(indptr[i], indptr[i + 1]):
+                    j = neighbors[k]
+                    s0 += weights[k] * coords[j, 0]
+                    s1 += weights[k] * coords[j, 1]
+                    s2 += weights[k] * coords[j, 2]
+                
+                new_coords[i, 0] = coords[i, 0] + factor * (s0 - coords[i, 0])
+                new_coords[i, 1] = coords[i, 1] + factor * (s1 - coords[i, 1])
+                new_coords[i, 2] = coords[i, 2] + factor * (s2 - coords[i, 2])
+            
+            coords = new_coords
+        
+        return coords
+else:
+    relax_iterations = relax_iterations_numpy
+
+def relax_vertices(bm, iterations=1, factor=1.0, cotangent=False):
+    bm.verts.index_update()
+    bm.verts.ensure_lookup_table()
+    
+    # Snapshot everything we need from BMesh once, attribute access is expensive
+    verts = bm.verts[:]
+    coords = vertex_coords(bm)
+    is_boundary = vertex_boundary_mask(bm)
+    
+    # Topology doesn't change while relaxing, so the neighbor structure is shared by all iterations
+    indptr, neighbors = csr_neighbors(bm)
+    counts = np.diff(indptr)
+    movable = ~is_boundary & (counts > 0)
+    if not movable.any():
+        return 0.0
+    
+    # Cotangent weights are computed once from the starting positions.
+    # Note that they reproduce linear functions exactly, so a flat mesh barely moves with them.
+    if cotangent:
+        weights = cotangent_weights(bm, coords, indptr, neighbors)
+    else:
+        weights = uniform_weights(indptr)
+    
+    new_coords = relax_iterations(coords.copy(), indptr, neighbors, weights, movable, iterations, factor)
+    
+    # Only touch vertices that actually moved
+    changed_mask = np.any(new_coords != coords, axis=1)
+    indices = np.flatnonzero(changed_mask)
+    for i, co in zip(indices.tolist(), new_coords[indices].tolist()):
+        verts[i].co = co
+    
+    # Average per-vertex displacement, lets callers detect when smoothing has plateaued
+    return np.linalg.norm(new_coords - coords, axis=1).mean()
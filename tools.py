@@ -1,30 +1,21 @@
 import bpy
 import bmesh
-from mathutils import Vector
-
-def relax_vertices(bm, iterations=1, factor=1.0):
-    for _ in range(iterations):
-        new_positions = {}
-        
-        for vert in bm.verts:
-            if vert.is_boundary:
-                continue
-            
-            if len(vert.link_edges) > 0:
-                neighbor_avg = Vector((0, 0, 0))
-                neighbor_count = 0
-                
-                for edge in vert.link_edges:
-                    other_vert = edge.other_vert(vert)
-                    neighbor_avg += other_vert.co
-                    neighbor_count += 1
-                
-                neighbor_avg /= neighbor_count
-                new_positions[vert.index] = vert.co.lerp(neighbor_avg, factor)
-
-        for vert in bm.verts:
-            if vert.index in new_positions:
-                vert.co = new_positions[vert.index]
+import numpy as np
+import os
+import sys
+
+# Blender runs these as text blocks rather than as a package, make the shared module importable
+for path in (os.path.dirname(os.path.abspath(__file__)), bpy.path.abspath("//")):
+    if os.path.isdir(path) and path not in sys.path:
+        sys.path.append(path)
+
+from remesh_core import (
+    edge_boundary_mask,
+    edge_lengths,
+    edge_vertex_indices,
+    relax_vertices,
+    vertex_boundary_mask,
+)
 
 
 class MESH_OT_relax_vertices(bpy.types.Operator):
@@ -49,6 +40,12 @@ class MESH_OT_relax_vertices(bpy.types.Operator):
         max=1.0
     )
     
+    cotangent: bpy.props.BoolProperty(
+        name="Cotangent Weights",
+        description="Weight neighbors by cotangents of opposite angles instead of a plain average",
+        default=False
+    )
+    
     @classmethod
     def poll(cls, context):
         return context.active_object is not None and context.active_object.type == 'MESH'
@@ -59,7 +56,7 @@ class MESH_OT_relax_vertices(bpy.types.Operator):
         
         bm = bmesh.from_edit_mesh(me)
 
-        relax_vertices(bm, iterations=self.iterations, factor=self.factor)
+        relax_vertices(bm, iterations=self.iterations, factor=self.factor, cotangent=self.cotangent)
 
         bmesh.update_edit_mesh(me)
         
@@ -81,16 +78,18 @@ class MESH_OT_subdivide_long_edges(bpy.types.Operator):
         me = obj.data
 
         bm = bmesh.from_edit_mesh(me)
-        boundary_edges = [e for e in bm.edges if e.is_boundary]
+        lengths = edge_lengths(bm)
+        is_boundary_edge = edge_boundary_mask(bm)
         
-        if not boundary_edges:
+        if not is_boundary_edge.any():
             self.report({'WARNING'}, "No boundary edges found")
             return {'CANCELLED'}
         
-        min_boundary_length = min(e.calc_length() for e in boundary_edges)
+        min_boundary_length = lengths[is_boundary_edge].min()
         threshold = min_boundary_length * 1.2
 
-        edges_to_subdivide = [e for e in bm.edges if not e.is_boundary and e.calc_length() > threshold]
+        bm.edges.ensure_lookup_table()
+        edges_to_subdivide = [bm.edges[i] for i in np.flatnonzero(~is_boundary_edge & (lengths > threshold))]
         
         if edges_to_subdivide:
             bmesh.ops.subdivide_edges(bm, edges=edges_to_subdivide, cuts=1)
@@ -122,14 +121,21 @@ class MESH_OT_collapse_short_edges(bpy.types.Operator):
         me = obj.data
 
         bm = bmesh.from_edit_mesh(me)
-        boundary_edges = [e for e in bm.edges if e.is_boundary]
+        lengths = edge_lengths(bm)
+        is_boundary_edge = edge_boundary_mask(bm)
         
-        if not boundary_edges:
+        if not is_boundary_edge.any():
             self.report({'WARNING'}, "No boundary edges found")
             return {'CANCELLED'}
         
-        min_boundary_length = 0.6 * min(e.calc_length() for e in boundary_edges)
-        edges_to_collapse = [e for e in bm.edges if not e.is_boundary and not e.verts[0].is_boundary and not e.verts[1].is_boundary and e.calc_length() < min_boundary_length]
+        edge_verts = edge_vertex_indices(bm)
+        is_boundary_vert = vertex_boundary_mask(bm)
+        
+        min_boundary_length = 0.6 * lengths[is_boundary_edge].min()
+        collapse_mask = ~is_boundary_edge & ~is_boundary_vert[edge_verts[:, 0]] & ~is_boundary_vert[edge_verts[:, 1]] & (lengths < min_boundary_length)
+        
+        bm.edges.ensure_lookup_table()
+        edges_to_collapse = [bm.edges[i] for i in np.flatnonzero(collapse_mask)]
         
         if edges_to_collapse:
             bmesh.ops.collapse(bm, edges=edges_to_collapse)
@@ -161,13 +167,14 @@ class MESH_OT_merge_close_vertices(bpy.types.Operator):
         me = obj.data
         
         bm = bmesh.from_edit_mesh(me)
-        boundary_edges = [e for e in bm.edges if e.is_boundary]
+        lengths = edge_lengths(bm)
+        is_boundary_edge = edge_boundary_mask(bm)
         
-        if not boundary_edges:
+        if not is_boundary_edge.any():
             self.report({'WARNING'}, "No boundary edges found")
             return {'CANCELLED'}
         
-        min_boundary_length = 0.6 * min(e.calc_length() for e in boundary_edges)
+        min_boundary_length = 0.6 * lengths[is_boundary_edge].min()
         
         bmesh.ops.remove_doubles(bm, verts=[vert for vert in bm.verts if not vert.is_boundary], dist=min_boundary_length)
         